@@ -24,13 +24,21 @@ class ApiService {
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`);
       }
-      return await response.json();
+      return ApiService.hydrateRows(await response.json());
     } catch (error) {
       console.error('API request failed:', error);
       throw error;
     }
   }
 
+  // List endpoints send { cols, rows } so keys are not repeated for every item
+  static hydrateRows(data) {
+    if (data && Array.isArray(data.cols) && Array.isArray(data.rows)) {
+      return data.rows.map(row => Object.fromEntries(data.cols.map((col, i) => [col, row[i]])));
+    }
+    return data;
+  }
+
   // Subjects API
   async getSubjects() {
     return await this.request('/api/subjects');
@@ -1,113 +1,465 @@
-from flask import Flask, request, jsonify, send_from_directory, session
+from flask import Flask, Response, abort, request, session, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_caching import Cache
+from flask_session import Session
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import sqlite3
+import queue
 import os
 from datetime import datetime, timedelta, date
+from collections import defaultdict
+from contextlib import contextmanager
+import functools
 import hashlib
+import hmac
 import secrets
 import json
+import mimetypes
+import orjson
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Serializa o JSON das respostas com orjson (extensão em C)"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
-app.secret_key = secrets.token_hex(16)
+app.json = ORJSONProvider(app)
+
+def ojson(obj, status=200):
+    """Monta a resposta JSON direto dos bytes gerados pelo orjson"""
+    return Response(
+        orjson.dumps(obj, default=ORJSONProvider.default),
+        status=status,
+        mimetype='application/json'
+    )
+
+def ojson_table(cursor):
+    """Responde uma listagem como {'cols': [...], 'rows': [[...], ...]}
+
+    Os nomes das colunas vão uma única vez e cada linha é uma tupla, serializada
+    direto pelo orjson sem montar um dicionário por linha.
+    """
+    cursor.row_factory = None
+    return ojson({
+        'cols': [column[0] for column in cursor.description],
+        'rows': cursor.fetchall()
+    })
+
+# Com vários workers, todos precisam da mesma chave para aceitar o cookie de sessão
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(16)
 CORS(app, supports_credentials=True)  # Habilita CORS para permitir requisições do frontend
 
-def get_db_connection():
-    """Conecta ao banco de dados SQLite"""
-    conn = sqlite3.connect('studyflow.db')
+# Com REDIS_URL definido, a sessão fica no Redis e o cookie leva só o id;
+# sem ele, continua a sessão assinada em cookie padrão do Flask
+if os.environ.get('REDIS_URL'):
+    import redis
+
+    app.config.update(
+        SESSION_TYPE='redis',
+        SESSION_REDIS=redis.Redis.from_url(os.environ['REDIS_URL']),
+        SESSION_PERMANENT=False
+    )
+    Session(app)
+
+# O cache em memória é por processo; com REDIS_URL ele é compartilhado entre workers
+SHARED_CACHE = bool(os.environ.get('REDIS_URL'))
+if SHARED_CACHE:
+    cache = Cache(app, config={'CACHE_TYPE': 'RedisCache', 'CACHE_REDIS_URL': os.environ['REDIS_URL']})
+else:
+    cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
+# Listagens GET ficam em cache por usuário por alguns segundos (só com cache compartilhado)
+GET_CACHE_TIMEOUT = 30
+
+# Argon2id com os parâmetros recomendados pela OWASP
+PH = PasswordHasher(time_cost=3, memory_cost=65536, parallelism=4)
+
+# Usuário inexistente também paga o custo do Argon2, para não revelar quais usernames existem
+DUMMY_PASSWORD_HASH = PH.hash(secrets.token_hex(16))
+
+# Logins bem-sucedidos ficam em cache por pouco tempo para evitar repetir o Argon2
+VERIFY_CACHE_TIMEOUT = 60
+VERIFY_CACHE_SECRET = secrets.token_bytes(32)
+
+DATABASE = 'studyflow.db'
+DB_POOL_SIZE = 8
+DB_CACHED_STATEMENTS = 256
+
+# SQL compartilhado entre rotas: o texto idêntico reaproveita o statement já preparado
+SQL_INSERT_USER = 'INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)'
+SQL_INSERT_SUBJECT = 'INSERT INTO subjects (user_id, name, color) VALUES (?, ?, ?)'
+SQL_INSERT_SESSION = '''
+    INSERT INTO study_sessions (user_id, subject_id, duration_minutes, date, start_time, end_time, notes, technique)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SQL_INSERT_SCHEDULE = '''
+    INSERT INTO schedule (user_id, subject_id, title, date, time, duration_minutes)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_INSERT_NOTE = 'INSERT INTO notes (user_id, subject_id, title, content) VALUES (?, ?, ?, ?)'
+
+# Conexões reaproveitadas entre requisições em vez de abrir o arquivo a cada vez
+_db_pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+
+def _connect():
+    """Abre uma nova conexão SQLite já configurada"""
+    # isolation_level=None: cada comando é sua própria transação, a menos que
+    # seja aberta uma explícita com write_transaction()
+    conn = sqlite3.connect(
+        DATABASE,
+        isolation_level=None,
+        check_same_thread=False,
+        cached_statements=DB_CACHED_STATEMENTS
+    )
     conn.row_factory = sqlite3.Row  # Para retornar dicionários
+    conn.executescript(
+        'PRAGMA foreign_keys=ON;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA mmap_size=268435456;'
+    )
     return conn
 
+def get_db():
+    """Retorna a conexão da requisição atual, pegando uma do pool se preciso"""
+    if '_db' not in g:
+        try:
+            g._db = _db_pool.get_nowait()
+        except queue.Empty:
+            g._db = _connect()
+    return g._db
+
+@app.teardown_appcontext
+def release_db(exception):
+    """Devolve a conexão ao pool ao fim da requisição"""
+    conn = g.pop('_db', None)
+    if conn is None:
+        return
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _db_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+def close_db_pool():
+    """Fecha as conexões ociosas do pool (ex.: antes do fork dos workers)"""
+    while True:
+        try:
+            _db_pool.get_nowait().close()
+        except queue.Empty:
+            return
+
+@app.errorhandler(sqlite3.IntegrityError)
+def handle_integrity_error(error):
+    """Referências inexistentes (foreign_keys=ON) ou campos obrigatórios nulos"""
+    return ojson({'error': 'Dados inválidos: referência inexistente ou campo obrigatório ausente'}, 400)
+
+@contextmanager
+def write_transaction():
+    """Agrupa várias escritas em uma única transação (um único commit)"""
+    conn = get_db()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+# Tabelas filhas de users/subjects, que usam ON DELETE CASCADE
+CASCADE_TABLES = ('subjects', 'study_sessions', 'schedule', 'notes')
+
+def _rename_tables_without_cascade(conn):
+    """Renomeia tabelas de bancos antigos, criadas sem ON DELETE CASCADE.
+
+    O SQLite não altera constraints de uma tabela existente; as tabelas
+    renomeadas são recriadas por init_db() e copiadas por _copy_legacy_tables().
+    Roda dentro da transação de init_db(), com legacy_alter_table ligado.
+    """
+    legacy_tables = [
+        table for table in CASCADE_TABLES
+        if any(fk['on_delete'] != 'CASCADE' for fk in conn.execute(f'PRAGMA foreign_key_list({table})'))
+    ]
+    for table in legacy_tables:
+        conn.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+
+def _copy_legacy_tables(conn):
+    """Copia os dados das tabelas renomeadas para as novas e remove as antigas"""
+    legacy_tables = [
+        table for table in CASCADE_TABLES
+        if conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f'{table}_legacy',)
+        ).fetchone()
+    ]
+    for table in legacy_tables:
+        conn.execute(f'INSERT INTO {table} SELECT * FROM {table}_legacy')
+    for table in reversed(legacy_tables):
+        conn.execute(f'DROP TABLE {table}_legacy')
+
 def init_db():
-    conn = get_db_connection()
+    conn = get_db()
     
-    # Criar tabela de usuários
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            full_name TEXT NOT NULL,
-            role TEXT DEFAULT 'user',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Criar tabela de disciplinas
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS subjects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            color TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
+    # WAL é persistente no arquivo: leitores não bloqueiam escritores
+    conn.execute('PRAGMA journal_mode=WAL')
     
-    # Criar tabela de sessões de estudo
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS study_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            duration_minutes INTEGER NOT NULL,
-            date DATE NOT NULL,
-            start_time TIME,
-            end_time TIME,
-            notes TEXT,
-            technique TEXT DEFAULT 'pomodoro',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (subject_id) REFERENCES subjects (id)
-        )
-    ''')
+    # A migração copia linhas entre tabelas; as constraints voltam a valer no fim.
+    # legacy_alter_table mantém as referências das outras tabelas apontando para
+    # o nome original. Os dois pragmas só podem mudar fora de uma transação.
+    conn.execute('PRAGMA foreign_keys=OFF')
+    conn.execute('PRAGMA legacy_alter_table=ON')
+    try:
+        # Verificação, renomeação, criação e cópia em uma única transação: outro
+        # processo iniciando ao mesmo tempo espera e depois encontra o schema pronto
+        with write_transaction():
+            _rename_tables_without_cascade(conn)
+            
+            # Criar tabela de usuários
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE NOT NULL,
+                    password_hash TEXT NOT NULL,
+                    full_name TEXT NOT NULL,
+                    role TEXT DEFAULT 'user',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Criar tabela de disciplinas
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS subjects (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    color TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Criar tabela de sessões de estudo
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS study_sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    subject_id INTEGER NOT NULL,
+                    duration_minutes INTEGER NOT NULL,
+                    date DATE NOT NULL,
+                    start_time TIME,
+                    end_time TIME,
+                    notes TEXT,
+                    technique TEXT DEFAULT 'pomodoro',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                    FOREIGN KEY (subject_id) REFERENCES subjects (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Criar tabela de agenda/cronograma
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS schedule (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    subject_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    date DATE NOT NULL,
+                    time TIME NOT NULL,
+                    duration_minutes INTEGER NOT NULL,
+                    completed BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                    FOREIGN KEY (subject_id) REFERENCES subjects (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Criar tabela de anotações
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS notes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    subject_id INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+                    FOREIGN KEY (subject_id) REFERENCES subjects (id) ON DELETE CASCADE
+                )
+            ''')
+            
+            _copy_legacy_tables(conn)
+    finally:
+        conn.execute('PRAGMA legacy_alter_table=OFF')
+        conn.execute('PRAGMA foreign_keys=ON')
     
-    # Criar tabela de agenda/cronograma
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS schedule (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            date DATE NOT NULL,
-            time TIME NOT NULL,
-            duration_minutes INTEGER NOT NULL,
-            completed BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (subject_id) REFERENCES subjects (id)
-        )
-    ''')
+    # Criar tabela de resumo diário (minutos e sessões por usuário, dia e disciplina).
+    # Verificação, criação, carga inicial e triggers em uma única transação: uma
+    # queda no meio não deixa a tabela criada sem a carga, e dois processos
+    # iniciando juntos não fazem a carga em dobro
+    with write_transaction():
+        has_daily_stats = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_stats'"
+        ).fetchone()
+        
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS daily_stats (
+                user_id INTEGER NOT NULL,
+                date DATE NOT NULL,
+                subject_id INTEGER NOT NULL,
+                total_minutes INTEGER NOT NULL DEFAULT 0,
+                session_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, date, subject_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Preencher o resumo com as sessões que já existiam antes da tabela
+        if not has_daily_stats:
+            conn.execute('''
+                INSERT INTO daily_stats (user_id, date, subject_id, total_minutes, session_count)
+                SELECT user_id, date, subject_id, SUM(duration_minutes), COUNT(*)
+                FROM study_sessions
+                GROUP BY user_id, date, subject_id
+            ''')
+        
+        # Manter o resumo atualizado a cada escrita em study_sessions
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_daily_stats_insert AFTER INSERT ON study_sessions
+            BEGIN
+                INSERT INTO daily_stats (user_id, date, subject_id, total_minutes, session_count)
+                VALUES (NEW.user_id, NEW.date, NEW.subject_id, NEW.duration_minutes, 1)
+                ON CONFLICT (user_id, date, subject_id) DO UPDATE SET
+                    total_minutes = total_minutes + excluded.total_minutes,
+                    session_count = session_count + 1;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_daily_stats_delete AFTER DELETE ON study_sessions
+            BEGIN
+                UPDATE daily_stats
+                SET total_minutes = total_minutes - OLD.duration_minutes, session_count = session_count - 1
+                WHERE user_id = OLD.user_id AND date = OLD.date AND subject_id = OLD.subject_id;
+                DELETE FROM daily_stats
+                WHERE user_id = OLD.user_id AND date = OLD.date AND subject_id = OLD.subject_id AND session_count <= 0;
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_daily_stats_update
+            AFTER UPDATE OF user_id, date, subject_id, duration_minutes ON study_sessions
+            BEGIN
+                UPDATE daily_stats
+                SET total_minutes = total_minutes - OLD.duration_minutes, session_count = session_count - 1
+                WHERE user_id = OLD.user_id AND date = OLD.date AND subject_id = OLD.subject_id;
+                DELETE FROM daily_stats
+                WHERE user_id = OLD.user_id AND date = OLD.date AND subject_id = OLD.subject_id AND session_count <= 0;
+                INSERT INTO daily_stats (user_id, date, subject_id, total_minutes, session_count)
+                VALUES (NEW.user_id, NEW.date, NEW.subject_id, NEW.duration_minutes, 1)
+                ON CONFLICT (user_id, date, subject_id) DO UPDATE SET
+                    total_minutes = total_minutes + excluded.total_minutes,
+                    session_count = session_count + 1;
+            END
+        ''')
     
-    # Criar tabela de anotações
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            subject_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            content TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (subject_id) REFERENCES subjects (id)
-        )
+    # Índices para os filtros por usuário + data/disciplina usados nas listagens
+    conn.executescript('''
+        CREATE INDEX IF NOT EXISTS idx_ss_user_date ON study_sessions (user_id, date DESC, start_time DESC);
+        CREATE INDEX IF NOT EXISTS idx_ss_user_subj_date ON study_sessions (user_id, subject_id, date);
+        CREATE INDEX IF NOT EXISTS idx_sched_user_date_time ON schedule (user_id, date, time);
+        CREATE INDEX IF NOT EXISTS idx_notes_user_updated ON notes (user_id, updated_at DESC);
+        CREATE INDEX IF NOT EXISTS idx_subjects_user_name ON subjects (user_id, name);
     ''')
     
-    conn.commit()
-    conn.close()
+    # Atualiza as estatísticas usadas pelo planejador de consultas
+    conn.execute('ANALYZE')
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    return PH.hash(password)
 
-def verify_password(password, password_hash):
-    return hashlib.sha256(password.encode()).hexdigest() == password_hash
+def is_legacy_hash(password_hash):
+    """Hashes antigos eram SHA-256 sem salt (hex), sem o prefixo PHC do Argon2"""
+    return not password_hash.startswith('$argon2')
 
+def verify_password(password, password_hash):
+    if is_legacy_hash(password_hash):
+        # Transitório: hashes SHA-256 são migrados para Argon2id no login
+        try:
+            expected = bytes.fromhex(password_hash)
+        except ValueError:
+            return False
+        return hmac.compare_digest(hashlib.sha256(password.encode()).digest(), expected)
+    try:
+        return PH.verify(password_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def verify_password_cached(username, password, password_hash):
+    """Verifica a senha reaproveitando resultados positivos recentes.
+
+    A chave inclui o hash armazenado, então trocar a senha invalida as entradas
+    antigas. Falhas nunca entram no cache.
+    """
+    key = 'pwd:' + hashlib.blake2b(
+        f'{username}:{password_hash}:{password}'.encode(),
+        key=VERIFY_CACHE_SECRET,
+        digest_size=16
+    ).hexdigest()
+    if cache.get(key):
+        return True
+    if verify_password(password, password_hash):
+        cache.set(key, True, timeout=VERIFY_CACHE_TIMEOUT)
+        return True
+    return False
+
+def password_needs_rehash(password_hash):
+    return is_legacy_hash(password_hash) or PH.check_needs_rehash(password_hash)
+
+# Rotas acessíveis sem login; todas as outras passam por require_auth()
+PUBLIC_ENDPOINTS = {'login', 'logout', 'current_user', 'serve_frontend', 'serve_static_files', 'static'}
+
+@app.before_request
 def require_auth():
-    if 'user_id' not in session:
-        return jsonify({'error': 'Authentication required'}), 401
+    """Bloqueia rotas protegidas antes do despacho quando não há usuário logado"""
+    if request.method == 'OPTIONS' or request.endpoint is None:
+        return None
+    if request.endpoint not in PUBLIC_ENDPOINTS and 'user_id' not in session:
+        return ojson({'error': 'Authentication required'}, 401)
     return None
 
+def _user_cache_key(scope):
+    """Chave da listagem do usuário atual, incluindo a versão e os filtros da URL"""
+    user_id = session['user_id']
+    version_key = f'ver:{scope}:{user_id}'
+    version = cache.get(version_key)
+    if version is None:
+        # Versão ausente (nunca criada ou removida do cache): começa uma nova,
+        # para não reaproveitar uma listagem gravada antes da última escrita
+        version = secrets.token_hex(8)
+        cache.set(version_key, version, timeout=0)
+    args = sorted(request.args.items(multi=True))
+    return f'{scope}:{user_id}:{version}:{args}'
+
+def cached_for_user(scope):
+    """Cacheia a resposta de uma rota GET separadamente para cada usuário"""
+    if not SHARED_CACHE:
+        # Sem Redis cada worker teria o próprio cache e a invalidação feita em
+        # um deles não alcançaria os outros: a rota fica sem cache
+        return lambda f: f
+    return cache.cached(timeout=GET_CACHE_TIMEOUT, key_prefix=lambda: _user_cache_key(scope))
+
+def invalidate_user_cache(*scopes):
+    """Descarta as listagens em cache do usuário atual trocando a versão das chaves"""
+    user_id = session.get('user_id')
+    if user_id is None or not SHARED_CACHE:
+        return
+    for scope in scopes:
+        cache.set(f'ver:{scope}:{user_id}', secrets.token_hex(8), timeout=0)
+
 @app.route('/api/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -115,21 +467,31 @@ def login():
     password = data.get('password')
     
     if not username or not password:
-        return jsonify({'error': 'Username and password required'}), 400
+        return ojson({'error': 'Username and password required'}, 400)
     
-    conn = get_db_connection()
+    conn = get_db()
     user = conn.execute(
         'SELECT id, username, password_hash, full_name, role FROM users WHERE username = ?',
         (username,)
     ).fetchone()
-    conn.close()
     
-    if user and verify_password(password, user['password_hash']):
+    if user is None:
+        verify_password(password, DUMMY_PASSWORD_HASH)
+        return ojson({'error': 'Invalid credentials'}, 401)
+    
+    if verify_password_cached(username, password, user['password_hash']):
+        # Atualiza hashes legados ou com parâmetros antigos de forma transparente
+        if password_needs_rehash(user['password_hash']):
+            conn.execute(
+                'UPDATE users SET password_hash = ? WHERE id = ?',
+                (hash_password(password), user['id'])
+            )
+        
         session['user_id'] = user['id']
         session['username'] = user['username']
         session['full_name'] = user['full_name']
         session['role'] = user['role']
-        return jsonify({
+        return ojson({
             'success': True,
             'user': {
                 'id': user['id'],
@@ -139,17 +501,17 @@ def login():
             }
         })
     else:
-        return jsonify({'error': 'Invalid credentials'}), 401
+        return ojson({'error': 'Invalid credentials'}, 401)
 
 @app.route('/api/logout', methods=['POST'])
 def logout():
     session.clear()
-    return jsonify({'success': True})
+    return ojson({'success': True})
 
 @app.route('/api/current-user', methods=['GET'])
 def current_user():
     if 'user_id' in session:
-        return jsonify({
+        return ojson({
             'user': {
                 'id': session['user_id'],
                 'username': session['username'],
@@ -158,67 +520,88 @@ def current_user():
             }
         })
     else:
-        return jsonify({'user': None})
+        return ojson({'user': None})
+
+# Os arquivos não têm hash no nome, então o cache no navegador é curto e
+# revalidado por ETag (304 sem reenviar o corpo)
+STATIC_MAX_AGE = 3600
+
+STATIC_EXTENSIONS = ('.html', '.js', '.css', '.ico', '.png', '.svg')
+
+def load_static_files(directory):
+    """Carrega os arquivos do frontend em memória com ETag e mimetype já calculados"""
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(STATIC_EXTENSIONS):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            body = f.read()
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        max_age = 0 if name.endswith('.html') else STATIC_MAX_AGE
+        files[name] = (body, etag, mimetype, f'public, max-age={max_age}')
+    return files
+
+# Apenas estes arquivos são servidos; o banco e o código ficam de fora
+STATIC_FILES = load_static_files(app.root_path)
+
+def static_response(path):
+    """Responde com o arquivo em memória ou 304 se o ETag do cliente ainda vale"""
+    if path not in STATIC_FILES:
+        abort(404)
+    body, etag, mimetype, cache_control = STATIC_FILES[path]
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': cache_control}
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype=mimetype, headers=headers)
 
 @app.route('/')
 def serve_frontend():
     """Serve o arquivo HTML principal"""
-    return send_from_directory('.', 'index.html')
+    return static_response('index.html')
 
 @app.route('/<path:path>')
 def serve_static_files(path):
     """Serve arquivos estáticos (CSS, JS, etc.)"""
-    return send_from_directory('.', path)
+    return static_response(path)
 
 # === ROTAS PARA DISCIPLINAS ===
 
 @app.route('/api/subjects', methods=['GET'])
+@cached_for_user('subjects')
 def get_subjects():
     """Retorna todas as disciplinas"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
-    conn = get_db_connection()
+    conn = get_db()
     subjects = conn.execute(
         'SELECT * FROM subjects WHERE user_id = ? ORDER BY name',
         (session['user_id'],)
-    ).fetchall()
-    conn.close()
-    return jsonify([dict(subject) for subject in subjects])
+    )
+    return ojson_table(subjects)
 
 @app.route('/api/subjects', methods=['POST'])
 def create_subject():
     """Cria uma nova disciplina"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     data = request.get_json()
     name = data.get('name')
     color = data.get('color', '#4A90E2')
 
     if not name:
-        return jsonify({'error': 'Nome da disciplina é obrigatório'}), 400
+        return ojson({'error': 'Nome da disciplina é obrigatório'}, 400)
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('INSERT INTO subjects (user_id, name, color) VALUES (?, ?, ?)', (session['user_id'], name, color))
+    cursor.execute(SQL_INSERT_SUBJECT, (session['user_id'], name, color))
     subject_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    invalidate_user_cache('subjects')
 
-    return jsonify({'id': subject_id, 'name': name, 'color': color}), 201
+    return ojson({'id': subject_id, 'name': name, 'color': color}, 201)
 
 # === ROTAS PARA SESSÕES DE ESTUDO ===
 
 @app.route('/api/study-sessions', methods=['GET'])
+@cached_for_user('sessions')
 def get_study_sessions():
     """Retorna sessões de estudo com filtros opcionais"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
     subject_id = request.args.get('subject_id')
@@ -245,32 +628,24 @@ def get_study_sessions():
 
     query += ' ORDER BY s.date DESC, s.start_time DESC'
 
-    conn = get_db_connection()
-    sessions = conn.execute(query, params).fetchall()
-    conn.close()
+    conn = get_db()
+    sessions = conn.execute(query, params)
 
-    return jsonify([dict(session) for session in sessions])
+    return ojson_table(sessions)
 
 @app.route('/api/study-sessions', methods=['POST'])
 def create_study_session():
     """Cria uma nova sessão de estudo"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     data = request.get_json()
 
     required_fields = ['subject_id', 'duration_minutes', 'date']
     for field in required_fields:
         if field not in data:
-            return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+            return ojson({'error': f'Campo {field} é obrigatório'}, 400)
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO study_sessions (user_id, subject_id, duration_minutes, date, start_time, end_time, notes, technique)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    cursor.execute(SQL_INSERT_SESSION, (
         session['user_id'],
         data['subject_id'],
         data['duration_minutes'], 
@@ -282,20 +657,16 @@ def create_study_session():
     ))
 
     session_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    invalidate_user_cache('sessions', 'stats')
 
-    return jsonify({'id': session_id, 'message': 'Sessão de estudo criada com sucesso'}), 201
+    return ojson({'id': session_id, 'message': 'Sessão de estudo criada com sucesso'}, 201)
 
 # === ROTAS PARA AGENDA/PLANEJAMENTO ===
 
 @app.route('/api/schedule', methods=['GET'])
+@cached_for_user('schedule')
 def get_schedule():
     """Retorna itens da agenda"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     date_filter = request.args.get('date')
     week_start = request.args.get('week_start')
 
@@ -317,32 +688,24 @@ def get_schedule():
 
     query += ' ORDER BY sch.date, sch.time'
 
-    conn = get_db_connection()
-    schedule_items = conn.execute(query, params).fetchall()
-    conn.close()
+    conn = get_db()
+    schedule_items = conn.execute(query, params)
 
-    return jsonify([dict(item) for item in schedule_items])
+    return ojson_table(schedule_items)
 
 @app.route('/api/schedule', methods=['POST'])
 def create_schedule_item():
     """Cria um novo item na agenda"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     data = request.get_json()
 
     required_fields = ['subject_id', 'title', 'date', 'time', 'duration_minutes']
     for field in required_fields:
         if field not in data:
-            return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+            return ojson({'error': f'Campo {field} é obrigatório'}, 400)
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO schedule (user_id, subject_id, title, date, time, duration_minutes)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (
+    cursor.execute(SQL_INSERT_SCHEDULE, (
         session['user_id'],
         data['subject_id'],
         data['title'],
@@ -352,10 +715,9 @@ def create_schedule_item():
     ))
 
     schedule_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    invalidate_user_cache('schedule')
 
-    return jsonify({'id': schedule_id, 'message': 'Item agendado com sucesso'}), 201
+    return ojson({'id': schedule_id, 'message': 'Item agendado com sucesso'}, 201)
 
 @app.route('/api/schedule/<int:schedule_id>', methods=['PUT'])
 def update_schedule_status(schedule_id):
@@ -363,23 +725,23 @@ def update_schedule_status(schedule_id):
     data = request.get_json()
     status = data.get('status', 'completed')
 
-    conn = get_db_connection()
+    # A tabela guarda o status como a coluna booleana completed
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('UPDATE schedule SET status = ? WHERE id = ?', (status, schedule_id))
-    conn.commit()
-    conn.close()
+    cursor.execute(
+        'UPDATE schedule SET completed = ? WHERE id = ? AND user_id = ?',
+        (status == 'completed', schedule_id, session['user_id'])
+    )
+    invalidate_user_cache('schedule')
 
-    return jsonify({'message': 'Status atualizado com sucesso'})
+    return ojson({'message': 'Status atualizado com sucesso'})
 
 # === ROTAS PARA ANOTAÇÕES ===
 
 @app.route('/api/notes', methods=['GET'])
+@cached_for_user('notes')
 def get_notes():
     """Retorna anotações"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     subject_id = request.args.get('subject_id')
 
     query = '''
@@ -396,87 +758,73 @@ def get_notes():
 
     query += ' ORDER BY n.updated_at DESC'
 
-    conn = get_db_connection()
-    notes = conn.execute(query, params).fetchall()
-    conn.close()
+    conn = get_db()
+    notes = conn.execute(query, params)
 
-    return jsonify([dict(note) for note in notes])
+    return ojson_table(notes)
 
 @app.route('/api/notes', methods=['POST'])
 def create_note():
     """Cria uma nova anotação"""
-    auth_error = require_auth()
-    if auth_error:
-        return auth_error
-    
     data = request.get_json()
 
     required_fields = ['subject_id', 'title', 'content']
     for field in required_fields:
         if field not in data:
-            return jsonify({'error': f'Campo {field} é obrigatório'}), 400
+            return ojson({'error': f'Campo {field} é obrigatório'}, 400)
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO notes (user_id, subject_id, title, content)
-        VALUES (?, ?, ?, ?)
-    ''', (session['user_id'], data['subject_id'], data['title'], data['content']))
+    cursor.execute(SQL_INSERT_NOTE, (session['user_id'], data['subject_id'], data['title'], data['content']))
 
     note_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    invalidate_user_cache('notes')
 
-    return jsonify({'id': note_id, 'message': 'Anotação criada com sucesso'}), 201
+    return ojson({'id': note_id, 'message': 'Anotação criada com sucesso'}, 201)
 
 # === ROTAS PARA RELATÓRIOS E ESTATÍSTICAS ===
 
 @app.route('/api/stats/weekly', methods=['GET'])
+@cached_for_user('stats')
 def get_weekly_stats():
     """Retorna estatísticas semanais"""
     week_start = request.args.get('week_start', date.today().strftime('%Y-%m-%d'))
 
-    conn = get_db_connection()
+    conn = get_db()
 
-    # Total de horas estudadas na semana
-    total_query = '''
-        SELECT SUM(duration_minutes) as total_minutes
-        FROM study_sessions 
-        WHERE date >= date(?) AND date < date(?, "+7 days")
+    # Lê o resumo diário já agregado (no máximo 7 dias x disciplinas)
+    query = '''
+        SELECT ds.date, ds.subject_id, s.name, s.color, ds.total_minutes, ds.session_count
+        FROM daily_stats ds
+        LEFT JOIN subjects s ON ds.subject_id = s.id
+        WHERE ds.user_id = ? AND ds.date >= date(?) AND ds.date < date(?, "+7 days")
     '''
 
-    total_result = conn.execute(total_query, (week_start, week_start)).fetchone()
-    total_hours = (total_result['total_minutes'] or 0) / 60
-
-    # Horas por disciplina
-    by_subject_query = '''
-        SELECT s.name, s.color, SUM(ss.duration_minutes) as total_minutes
-        FROM study_sessions ss
-        JOIN subjects s ON ss.subject_id = s.id
-        WHERE ss.date >= date(?) AND ss.date < date(?, "+7 days")
-        GROUP BY ss.subject_id, s.name, s.color
-        ORDER BY total_minutes DESC
-    '''
+    rows = conn.execute(query, (session['user_id'], week_start, week_start)).fetchall()
 
-    by_subject = conn.execute(by_subject_query, (week_start, week_start)).fetchall()
+    # Total, horas por disciplina e sessões por dia calculados em uma passada
+    total_minutes = 0
+    by_subject = {}
+    daily = defaultdict(lambda: {'total_minutes': 0, 'session_count': 0})
 
-    # Sessões por dia da semana
-    daily_query = '''
-        SELECT date, SUM(duration_minutes) as total_minutes, COUNT(*) as session_count
-        FROM study_sessions
-        WHERE date >= date(?) AND date < date(?, "+7 days")
-        GROUP BY date
-        ORDER BY date
-    '''
+    for row in rows:
+        total_minutes += row['total_minutes']
 
-    daily = conn.execute(daily_query, (week_start, week_start)).fetchall()
+        day = daily[row['date']]
+        day['total_minutes'] += row['total_minutes']
+        day['session_count'] += row['session_count']
 
-    conn.close()
+        if row['name'] is not None:
+            subject = by_subject.setdefault(
+                row['subject_id'],
+                {'name': row['name'], 'color': row['color'], 'total_minutes': 0}
+            )
+            subject['total_minutes'] += row['total_minutes']
 
-    return jsonify({
-        'total_hours': round(total_hours, 2),
-        'by_subject': [dict(row) for row in by_subject],
-        'daily': [dict(row) for row in daily]
+    return ojson({
+        'total_hours': round(total_minutes / 60, 2),
+        'by_subject': sorted(by_subject.values(), key=lambda subject: subject['total_minutes'], reverse=True),
+        'daily': [{'date': day, **daily[day]} for day in sorted(daily)]
     })
 
 # === ROTA PARA TIMER POMODORO ===
@@ -499,12 +847,10 @@ def save_pomodoro_session():
         'notes': f"Sessão Pomodoro - {duration_minutes} minutos"
     }
 
-    conn = get_db_connection()
+    conn = get_db()
     cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO study_sessions (subject_id, duration_minutes, date, start_time, end_time, notes, technique)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (
+    cursor.execute(SQL_INSERT_SESSION, (
+        session['user_id'],
         session_data['subject_id'],
         session_data['duration_minutes'], 
         session_data['date'],
@@ -515,49 +861,37 @@ def save_pomodoro_session():
     ))
 
     session_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    invalidate_user_cache('sessions', 'stats')
 
-    return jsonify({'id': session_id, 'message': 'Sessão Pomodoro salva com sucesso'}), 201
+    return ojson({'id': session_id, 'message': 'Sessão Pomodoro salva com sucesso'}, 201)
 
-def require_admin():
+def admin_required(f):
     """Decorator para verificar se o usuário é admin"""
-    def decorator(f):
-        def wrapper(*args, **kwargs):
-            if 'user_id' not in session:
-                return jsonify({'error': 'Authentication required'}), 401
-            if session.get('role') != 'admin':
-                return jsonify({'error': 'Admin access required'}), 403
-            return f(*args, **kwargs)
-        wrapper.__name__ = f.__name__
-        return wrapper
-    return decorator
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        if 'user_id' not in session:
+            return ojson({'error': 'Authentication required'}, 401)
+        if session.get('role') != 'admin':
+            return ojson({'error': 'Admin access required'}, 403)
+        return f(*args, **kwargs)
+    return wrapper
 
 # Endpoints de administração de usuários
 @app.route('/api/admin/users', methods=['GET'])
+@admin_required
 def get_all_users():
     """Listar todos os usuários (apenas admin)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Authentication required'}), 401
-    if session.get('role') != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-    
-    conn = get_db_connection()
+    conn = get_db()
     users = conn.execute(
         'SELECT id, username, full_name, role, created_at FROM users ORDER BY created_at DESC'
-    ).fetchall()
-    conn.close()
+    )
     
-    return jsonify([dict(user) for user in users])
+    return ojson_table(users)
 
 @app.route('/api/admin/users', methods=['POST'])
+@admin_required
 def create_user():
     """Criar novo usuário (apenas admin)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Authentication required'}), 401
-    if session.get('role') != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-    
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
@@ -565,50 +899,39 @@ def create_user():
     role = data.get('role', 'user')
     
     if not username or not password or not full_name:
-        return jsonify({'error': 'Username, password and full_name are required'}), 400
+        return ojson({'error': 'Username, password and full_name are required'}, 400)
     
     if role not in ['user', 'admin']:
-        return jsonify({'error': 'Role must be user or admin'}), 400
-    
-    conn = get_db_connection()
+        return ojson({'error': 'Role must be user or admin'}, 400)
     
-    # Verificar se o username já existe
-    existing_user = conn.execute(
-        'SELECT id FROM users WHERE username = ?', (username,)
-    ).fetchone()
-    
-    if existing_user:
-        conn.close()
-        return jsonify({'error': 'Username already exists'}), 400
-    
-    # Criar novo usuário
+    # Calcular o hash antes da transação para não segurar o lock de escrita
     password_hash = hash_password(password)
-    cursor = conn.cursor()
-    cursor.execute(
-        'INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)',
-        (username, password_hash, full_name, role)
-    )
     
-    user_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with write_transaction() as conn:
+        # Verificar se o username já existe
+        existing_user = conn.execute(
+            'SELECT id FROM users WHERE username = ?', (username,)
+        ).fetchone()
+        
+        if existing_user:
+            return ojson({'error': 'Username already exists'}, 400)
+        
+        # Criar novo usuário
+        cursor = conn.execute(SQL_INSERT_USER, (username, password_hash, full_name, role))
+        user_id = cursor.lastrowid
     
-    return jsonify({
+    return ojson({
         'id': user_id,
         'username': username,
         'full_name': full_name,
         'role': role,
         'message': 'User created successfully'
-    }), 201
+    }, 201)
 
 @app.route('/api/admin/users/<int:user_id>', methods=['PUT'])
+@admin_required
 def update_user(user_id):
     """Atualizar usuário (apenas admin)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Authentication required'}), 401
-    if session.get('role') != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-    
     data = request.get_json()
     username = data.get('username')
     full_name = data.get('full_name')
@@ -616,48 +939,38 @@ def update_user(user_id):
     password = data.get('password')  # Opcional
     
     if not username or not full_name or not role:
-        return jsonify({'error': 'Username, full_name and role are required'}), 400
+        return ojson({'error': 'Username, full_name and role are required'}, 400)
     
     if role not in ['user', 'admin']:
-        return jsonify({'error': 'Role must be user or admin'}), 400
+        return ojson({'error': 'Role must be user or admin'}, 400)
     
-    conn = get_db_connection()
+    conn = get_db()
     
-    # Verificar se o usuário existe
-    existing_user = conn.execute(
-        'SELECT id FROM users WHERE id = ?', (user_id,)
-    ).fetchone()
+    # Atualizar usuário, desde que o username não pertença a outro usuário
+    fields = 'username = ?, full_name = ?, role = ?'
+    params = [username, full_name, role]
     
-    if not existing_user:
-        conn.close()
-        return jsonify({'error': 'User not found'}), 404
-    
-    # Verificar se o username já existe em outro usuário
-    username_check = conn.execute(
-        'SELECT id FROM users WHERE username = ? AND id != ?', (username, user_id)
-    ).fetchone()
-    
-    if username_check:
-        conn.close()
-        return jsonify({'error': 'Username already exists'}), 400
-    
-    # Atualizar usuário
     if password:
-        password_hash = hash_password(password)
-        conn.execute(
-            'UPDATE users SET username = ?, full_name = ?, role = ?, password_hash = ? WHERE id = ?',
-            (username, full_name, role, password_hash, user_id)
-        )
-    else:
-        conn.execute(
-            'UPDATE users SET username = ?, full_name = ?, role = ? WHERE id = ?',
-            (username, full_name, role, user_id)
-        )
+        fields += ', password_hash = ?'
+        params.append(hash_password(password))
     
-    conn.commit()
-    conn.close()
+    params.extend([user_id, username, user_id])
+    cursor = conn.execute(
+        f'''UPDATE users SET {fields}
+            WHERE id = ? AND NOT EXISTS (SELECT 1 FROM users WHERE username = ? AND id != ?)''',
+        params
+    )
+    
+    if cursor.rowcount == 0:
+        # Nada foi alterado: descobrir se o usuário não existe ou se o username está em uso
+        existing_user = conn.execute(
+            'SELECT id FROM users WHERE id = ?', (user_id,)
+        ).fetchone()
+        if not existing_user:
+            return ojson({'error': 'User not found'}, 404)
+        return ojson({'error': 'Username already exists'}, 400)
     
-    return jsonify({
+    return ojson({
         'id': user_id,
         'username': username,
         'full_name': full_name,
@@ -666,78 +979,49 @@ def update_user(user_id):
     })
 
 @app.route('/api/admin/users/<int:user_id>', methods=['DELETE'])
+@admin_required
 def delete_user(user_id):
     """Excluir usuário (apenas admin)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'Authentication required'}), 401
-    if session.get('role') != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-    
     # Não permitir que o admin exclua a si mesmo
     if user_id == session['user_id']:
-        return jsonify({'error': 'Cannot delete your own account'}), 400
+        return ojson({'error': 'Cannot delete your own account'}, 400)
     
-    conn = get_db_connection()
+    conn = get_db()
     
-    # Verificar se o usuário existe
-    existing_user = conn.execute(
-        'SELECT id FROM users WHERE id = ?', (user_id,)
-    ).fetchone()
+    # Disciplinas, sessões, agenda e anotações são removidas pelo ON DELETE CASCADE
+    cursor = conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
     
-    if not existing_user:
-        conn.close()
-        return jsonify({'error': 'User not found'}), 404
+    if cursor.rowcount == 0:
+        return ojson({'error': 'User not found'}, 404)
     
-    # Excluir dados relacionados ao usuário
-    conn.execute('DELETE FROM study_sessions WHERE subject_id IN (SELECT id FROM subjects WHERE user_id = ?)', (user_id,))
-    conn.execute('DELETE FROM schedule WHERE user_id = ?', (user_id,))
-    conn.execute('DELETE FROM notes WHERE user_id = ?', (user_id,))
-    conn.execute('DELETE FROM subjects WHERE user_id = ?', (user_id,))
-    conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
-    
-    conn.commit()
-    conn.close()
-    
-    return jsonify({'message': 'User deleted successfully'})
+    return ojson({'message': 'User deleted successfully'})
 
 def create_default_users():
     """Cria usuários padrão se não existirem"""
-    conn = get_db_connection()
+    conn = get_db()
     
     # Verificar se já existem usuários
     existing_users = conn.execute('SELECT COUNT(*) as count FROM users').fetchone()
     
     if existing_users['count'] == 0:
-        # Criar usuário admin
-        admin_password = hash_password('admin123')
-        conn.execute(
-            'INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)',
-            ('admin', admin_password, 'Administrador', 'admin')
-        )
-        
-        # Criar usuário Lucas Mendes
-        lucas_password = hash_password('lucas123')
-        conn.execute(
-            'INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)',
-            ('lucas.mendes', lucas_password, 'Lucas Mendes', 'user')
-        )
-        
-        # Criar usuário Ana Beatriz
-        ana_password = hash_password('ana123')
-        conn.execute(
-            'INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)',
-            ('ana.beatriz', ana_password, 'Ana Beatriz', 'user')
-        )
+        # Criar usuários admin, Lucas Mendes e Ana Beatriz em um único lote
+        default_users = [
+            ('admin', hash_password('admin123'), 'Administrador', 'admin'),
+            ('lucas.mendes', hash_password('lucas123'), 'Lucas Mendes', 'user'),
+            ('ana.beatriz', hash_password('ana123'), 'Ana Beatriz', 'user')
+        ]
+        with write_transaction() as conn:
+            conn.executemany(SQL_INSERT_USER, default_users)
         
-        conn.commit()
         print('Usuários padrão criados:')
         print('- admin / admin123')
         print('- lucas.mendes / lucas123')
         print('- ana.beatriz / ana123')
     
-    conn.close()
 
 if __name__ == '__main__':
-    init_db()
-    create_default_users()
-    app.run(debug=True)
+    # Servidor de desenvolvimento; em produção use o gunicorn com wsgi.py
+    with app.app_context():
+        init_db()
+        create_default_users()
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1')
@@ -0,0 +1,13 @@
+"""Ponto de entrada para servidores WSGI de produção.
+
+    gunicorn -w $(nproc) -k gthread --threads 4 --preload wsgi:app
+"""
+from app import app, init_db, create_default_users, close_db_pool
+
+with app.app_context():
+    init_db()
+    create_default_users()
+
+# Com --preload o módulo é importado antes do fork: nenhuma conexão SQLite
+# aberta aqui pode ser herdada pelos workers
+close_db_pool()